@@ -1,58 +1,122 @@
 # api_helpers.py
 
-import requests
+import asyncio
+import httpx
 import logging
-import time
+import random
 import json
+import orjson
 from typing import Tuple, Optional
 import geopy
 from config import ZYTE_PROXY, ZYTE_CERT
 
 
 from utils import get_fresh_headers
-from config import RETRY_DELAY
 
 
-def get_lat_long_zepto(pincode: str, max_retries: int = 1) -> Tuple[Optional[float], Optional[float]]:
+# Transport failures worth retrying; anything else won't improve on a second try
+_RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+def create_async_client(limit: int = 64, proxy: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    Create an HTTP/2 client for the async helpers.
+    Concurrent requests to the same Zepto host are multiplexed over one TLS connection.
+    Proxied requests get a longer timeout. Waiting for a free connection isn't counted
+    against it; callers bound concurrency instead.
+    """
+    timeout = 20.0 if proxy else 15.0
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=limit, max_keepalive_connections=max(1, limit // 2)),
+        timeout=httpx.Timeout(timeout, pool=None),
+        verify=False,
+        proxy=proxy,
+        headers={"accept-encoding": "gzip"}
+    )
+
+
+def run_sync(func, *args, proxy: Optional[str] = None, **kwargs):
+    """Run an async helper to completion on a short-lived client, for synchronous callers."""
+    async def runner():
+        async with create_async_client(proxy=proxy) as client:
+            return await func(*args, client=client, **kwargs)
+    return asyncio.run(runner())
+
+
+def _backoff(attempt: int, base: float = 0.5, cap: float = 10.0) -> float:
+    """Full-jitter exponential backoff delay for the given retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _is_retryable_status(status: int) -> bool:
+    """Only rate limiting and server errors are worth retrying; other 4xx won't change."""
+    return status == 429 or status >= 500
+
+
+async def get_with_retries(client: httpx.AsyncClient, url: str, max_retries: int = 3, **kwargs) -> httpx.Response:
+    """
+    GET url, retrying transport failures, rate limiting and server errors with backoff.
+    Returns the last response, or raises the last error if every attempt failed in transport.
+    """
+    for attempt in range(max_retries):
+        if attempt > 0:
+            delay = _backoff(attempt)
+            logging.info("Waiting %.2fs before retrying %s...", delay, url)
+            await asyncio.sleep(delay)
+        try:
+            response = await client.get(url, **kwargs)
+        except _RETRYABLE_ERRORS as e:
+            logging.error("Request error: %s", e)
+            if attempt < max_retries - 1:
+                continue
+            raise
+        if _is_retryable_status(response.status_code) and attempt < max_retries - 1:
+            logging.error("Unexpected status code: %s", response.status_code)
+            continue
+        return response
+
+
+async def get_lat_long_zepto_async(pincode: str, client: httpx.AsyncClient, max_retries: int = 1) -> Tuple[Optional[float], Optional[float]]:
     """Get latitude and longitude for a pincode via Zepto's autocomplete and details APIs."""
     headers = get_fresh_headers()
     params = {'place_name': pincode}
-    logging.info(f"Getting place ID for pincode {pincode}")
+    logging.info("Getting place ID for pincode %s", pincode)
     try:
-        response = requests.get(
+        response = await client.get(
             'https://api.zeptonow.com/api/v1/maps/place/autocomplete/',
             params=params,
-            headers=headers,
-            timeout=15
+            headers=headers
         )
         # with open(f"Place_ID/zepto_autocomplete_{pincode}.json", "w") as f:
         #     json.dump(response.json(), f, indent=4)
-        place_id = response.json()['predictions'][0]['place_id']
-        logging.info(f"Place ID for pincode {pincode}: {place_id}")
+        data = orjson.loads(response.content)
+        place_id = data['predictions'][0]['place_id']
+        logging.info("Place ID for pincode %s: %s", pincode, place_id)
     except Exception as e:
-        logging.error(f"Error getting place ID for pincode {pincode}: {e}")
+        logging.error("Error getting place ID for pincode %s: %s", pincode, e)
         return None, None
 
     params = {'place_id': place_id}
     try:
-        response = requests.get(
+        response = await client.get(
             'https://api.zeptonow.com/api/v1/maps/place/details/',
             params=params,
             headers=headers
         )
-        lat = response.json()['result']['geometry']['location']['lat']
-        lng = response.json()['result']['geometry']['location']['lng']
-        logging.info(f"Latitude and Longitude for pincode {pincode}: {lat}, {lng}")
+        data = orjson.loads(response.content)
+        location = data['result']['geometry']['location']
+        lat = location['lat']
+        lng = location['lng']
+        logging.info("Latitude and Longitude for pincode %s: %s, %s", pincode, lat, lng)
     except Exception as e:
-        logging.error(f"Error getting lat/long: {e}")
+        logging.error("Error getting lat/long: %s", e)
         return None, None
 
     return lat, lng
 
 
-
-
-def get_zepto_store_id(lat: float, lng: float,pincode:str, max_retries: int = 1) -> Optional[str]:
+async def get_zepto_store_id_async(lat: float, lng: float, pincode: str, client: httpx.AsyncClient, max_retries: int = 3) -> Optional[str]:
     """Get store ID from Zepto API using latitude and longitude."""
     url = "https://api.zepto.co.in/api/v1/config/layout/"
     for attempt in range(max_retries):
@@ -64,29 +128,31 @@ def get_zepto_store_id(lat: float, lng: float,pincode:str, max_retries: int = 1)
             "version": "v2",
             "show_new_eta_banner": "true"
         }
-        logging.info(f"Attempt {attempt+1} to get store ID for coordinates: {lat}, {lng}")
+        logging.info("Attempt %s to get store ID for coordinates: %s, %s", attempt+1, lat, lng)
         if attempt > 0:
-            delay = RETRY_DELAY * (attempt + 1)
-            logging.info(f"Waiting {delay}s before retry...")
-            time.sleep(delay)
+            delay = _backoff(attempt)
+            logging.info("Waiting %.2fs before retry...", delay)
+            await asyncio.sleep(delay)
         try:
-            '''response = requests.get(url, headers=headers, params=params, proxies=ZYTE_PROXY, verify=ZYTE_CERT, timeout=15)'''
-            response = requests.get(url, headers=headers, params=params, verify=False, timeout=15)
-        except Exception as e:
-            logging.error(f"Request error: {e}")
+            response = await client.get(url, headers=headers, params=params)
+        except _RETRYABLE_ERRORS as e:
+            logging.error("Request error: %s", e)
             if attempt < max_retries - 1:
                 continue
             return None
+        except Exception as e:
+            logging.error("Request error: %s", e)
+            return None
         if response.status_code != 200:
-            logging.error(f"Unexpected status code: {response.status_code}")
-            if attempt < max_retries - 1:
+            logging.error("Unexpected status code: %s", response.status_code)
+            if _is_retryable_status(response.status_code) and attempt < max_retries - 1:
                 continue
             return None
-        logging.info(f"Response text for store ID request: {response.text}")
+        logging.debug("Response body for store ID request: %s", response.content)
         try:
-            out = response.json()
+            out = orjson.loads(response.content)
         except Exception as e:
-            logging.error(f"Failed to parse JSON: {e}")
+            logging.error("Failed to parse JSON: %s", e)
             if attempt < max_retries - 1:
                 continue
             return None
@@ -103,11 +169,11 @@ def get_zepto_store_id(lat: float, lng: float,pincode:str, max_retries: int = 1)
                 continue
             return None
         return store_id
-    return None 
+    return None
 
 
 #New function to get EDT
-def get_edt(lat: float, lng: float, store_id: str, max_retries: int = 2) -> Optional[str]:
+async def get_edt_async(lat: float, lng: float, store_id: str, client: httpx.AsyncClient, max_retries: int = 2) -> Optional[str]:
     """Get Estimated Delivery Time (EDT) from Zepto API using latitude, longitude, and store ID."""
     url = "https://api.zepto.co.in/api/v2/inventory/banner/eta-info"
     for attempt in range(max_retries):
@@ -119,36 +185,54 @@ def get_edt(lat: float, lng: float, store_id: str, max_retries: int = 2) -> Opti
             "version": "v2",
             "show_new_eta_banner": "true"
         }
-        logging.info(f"Attempt {attempt+1} to get EDT for store ID: {store_id}")
+        logging.info("Attempt %s to get EDT for store ID: %s", attempt+1, store_id)
         if attempt > 0:
-            delay = RETRY_DELAY * (attempt + 1)
-            logging.info(f"Waiting {delay}s before retry...")
-            time.sleep(delay)
+            delay = _backoff(attempt)
+            logging.info("Waiting %.2fs before retry...", delay)
+            await asyncio.sleep(delay)
         try:
-            response = requests.get(url, headers=headers, params=params, verify=False, timeout=15)
-        except Exception as e:
-            logging.error(f"Request error: {e}")
+            response = await client.get(url, headers=headers, params=params)
+        except _RETRYABLE_ERRORS as e:
+            logging.error("Request error: %s", e)
             if attempt < max_retries - 1:
                 continue
             return None
+        except Exception as e:
+            logging.error("Request error: %s", e)
+            return None
         if response.status_code != 200:
-            logging.error(f"Unexpected status code: {response.status_code}")
-            if attempt < max_retries - 1:
+            logging.error("Unexpected status code: %s", response.status_code)
+            if _is_retryable_status(response.status_code) and attempt < max_retries - 1:
                 continue
             return None
         try:
-            out = response.json()
+            out = orjson.loads(response.content)
         except Exception as e:
-            logging.error(f"Failed to parse JSON: {e}")
+            logging.error("Failed to parse JSON: %s", e)
             if attempt < max_retries - 1:
                 continue
             return None
         edt = out.get('secondaryText')
-        logging.info(f"EDT for store ID {store_id}: {edt}")
+        logging.info("EDT for store ID %s: %s", store_id, edt)
         if not edt:
             logging.error("No EDT in available slot")
             if attempt < max_retries - 1:
                 continue
             return None
         return edt
-    return None    
\ No newline at end of file
+    return None
+
+
+def get_lat_long_zepto(pincode: str, max_retries: int = 1) -> Tuple[Optional[float], Optional[float]]:
+    """Synchronous wrapper around get_lat_long_zepto_async."""
+    return run_sync(get_lat_long_zepto_async, pincode, max_retries=max_retries)
+
+
+def get_zepto_store_id(lat: float, lng: float,pincode:str, max_retries: int = 3) -> Optional[str]:
+    """Synchronous wrapper around get_zepto_store_id_async."""
+    return run_sync(get_zepto_store_id_async, lat, lng, pincode, max_retries=max_retries)
+
+
+def get_edt(lat: float, lng: float, store_id: str, max_retries: int = 2) -> Optional[str]:
+    """Synchronous wrapper around get_edt_async."""
+    return run_sync(get_edt_async, lat, lng, store_id, max_retries=max_retries)
@@ -22,6 +22,12 @@ MAX_RETRIES = 3
 THREAD_POOL_SIZE = 3
 RETRY_DELAY = 10
 
+# Cache Configuration
+CACHE_DIR = "cache"
+PINCODE_CACHE_TTL = 3600
+PDP_CACHE_TTL = 86400
+PRODUCT_CACHE_TTL = 900
+
 # Zyte Proxy Configuration
 ZYTE_PROXY = {
     "http": "http://756c70b43e174b59b96af426cda9f345:@api.zyte.com:8011/",
@@ -1,10 +1,28 @@
+"""Prefect flow that scrapes Zepto products in chunks.
+
+Each product's HTTP calls run over HTTP/2 clients shared by the chunk. As
+soon as a product's responses are in, they are parsed into a row on the
+event loop (one regex and one JSON decode, cheaper than shipping the page to
+another process), so only pages still in flight are held in memory. The
+number of products in flight per flow run is set by the ``concurrency``
+parameter (default 64, see prefect.yaml).
+
+Concurrency across flow runs is controlled on the worker side. Start workers
+with ``prefect worker start --pool <pool> --limit N`` and size N to the
+number of batches the upstream APIs can take at once; each run already keeps
+up to ``concurrency`` requests in flight, so N is usually small.
+"""
+
 from __future__ import annotations
 
+import asyncio
+from collections import Counter
 from typing import Any
 
-from prefect import flow, get_run_logger, task
+import httpx
+from prefect import flow, get_run_logger
 
-from zepto_scraper import scrape_product
+from zepto_scraper import scrape_clients, scrape_product_async
 
 
 def chunked(items: list[dict[str, Any]], size: int = 1000):
@@ -12,49 +30,78 @@ def chunked(items: list[dict[str, Any]], size: int = 1000):
         yield items[index : index + size]
 
 
-@task(retries=3, retry_delay_seconds=10)
-def scrape_task(pdp_url: str, pincode: str) -> dict[str, Any]:
-    result = scrape_product(pdp_url, pincode)
-    if result is None:
-        return {"status": "failed", "url": pdp_url, "pincode": pincode}
-
-    if hasattr(result, "to_dict"):
-        payload = result.to_dict()
-    else:
-        payload = dict(result)
+async def scrape_item(
+    pdp_url: str,
+    pincode: str,
+    client: httpx.AsyncClient,
+    proxy_client: httpx.AsyncClient,
+) -> tuple[tuple[str, str], dict[str, Any] | None]:
+    try:
+        row = await scrape_product_async(pdp_url, pincode, client, proxy_client)
+    except Exception:
+        row = None
+    return (pdp_url, pincode), row
+
+
+async def _scrape_chunk(
+    keys: list[tuple[str, str]], concurrency: int
+) -> list[tuple[tuple[str, str], dict[str, Any] | None]]:
+    scraped = []
+    # Keep at most `concurrency` products in flight so requests don't queue on the connection pool
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(url: str, pincode: str):
+        async with semaphore:
+            return await scrape_item(url, pincode, client, proxy_client)
+
+    async with scrape_clients(limit=concurrency) as (client, proxy_client):
+        pending = [limited(url, pincode) for url, pincode in keys]
+        for next_done in asyncio.as_completed(pending):
+            scraped.append(await next_done)
+    return scraped
+
+
+def _run_chunk(
+    group: list[dict[str, str]],
+    concurrency: int,
+    scraped: dict[tuple[str, str], dict[str, Any]],
+) -> tuple[int, int]:
+    # Each (url, pincode) pair is scraped once; duplicates share its outcome
+    counts = Counter((item["url"], item["pincode"]) for item in group)
+    success = sum(count for key, count in counts.items() if key in scraped)
+    failed = 0
 
-    payload["status"] = "success"
-    payload["url"] = pdp_url
-    payload["pincode"] = pincode
-    return payload
+    keys = [key for key in counts if key not in scraped]
+    for key, row in asyncio.run(_scrape_chunk(keys, concurrency)):
+        if row is None:
+            failed += counts[key]
+            continue
+        row["status"] = "success"
+        row["url"], row["pincode"] = key
+        scraped[key] = row
+        success += counts[key]
+    return success, failed
 
 
 @flow(name="zepto-batch")
-def run_batch(products: list[dict[str, str]], chunk_size: int = 1000) -> dict[str, int]:
+def run_batch(
+    products: list[dict[str, str]], chunk_size: int = 1000, concurrency: int = 64
+) -> dict[str, int]:
     logger = get_run_logger()
     total = len(products)
     success = 0
     failed = 0
+    # Successful results from earlier chunks, so repeats across chunks aren't re-scraped
+    scraped: dict[tuple[str, str], dict[str, Any]] = {}
 
     if total == 0:
         return {"total": 0, "success": 0, "failed": 0}
 
     for batch_number, group in enumerate(chunked(products, chunk_size), start=1):
         logger.info("Submitting chunk %s with %s products", batch_number, len(group))
-        futures = scrape_task.map(
-            [item["url"] for item in group],
-            [item["pincode"] for item in group],
-        )
-
-        for future in futures:
-            try:
-                data = future.result()
-                if isinstance(data, dict) and data.get("status") == "success":
-                    success += 1
-                else:
-                    failed += 1
-            except Exception:
-                failed += 1
+        chunk_success, chunk_failed = _run_chunk(group, concurrency, scraped)
+        success += chunk_success
+        failed += chunk_failed
 
         logger.info(
             "Chunk %s completed. Running totals -> success: %s, failed: %s",
@@ -4,7 +4,6 @@ import os
 import logging
 from datetime import datetime
 import random
-import string
 import uuid
 
 from config import DEVICE_MODELS, DEVICE_BRANDS, OKHTTP_USER_AGENTS, COMPATIBLE_COMPONENTS
@@ -12,17 +11,17 @@ from config import DEVICE_MODELS, DEVICE_BRANDS, OKHTTP_USER_AGENTS, COMPATIBLE_
 
 def generate_device_uid() -> str:
     """Generate a random device UID in Zepto's format."""
-    return ''.join(random.choices(string.hexdigits.lower(), k=16))
+    return os.urandom(8).hex()
 
 
 def generate_session_id() -> str:
     """Generate a random session ID in Zepto's format."""
-    return ''.join(random.choices(string.hexdigits.lower(), k=32))
+    return os.urandom(16).hex()
 
 
 def generate_request_id() -> str:
     """Generate a random request ID in Zepto's format."""
-    return ''.join(random.choices(string.hexdigits.lower(), k=32))
+    return os.urandom(16).hex()
 
 
 def get_random_user_agent() -> str:
@@ -40,52 +39,53 @@ def get_random_device_brand() -> str:
     return random.choice(DEVICE_BRANDS)
 
 
+# Header fields that never change between requests, built once at import
+_STATIC_HEADERS = {
+    "accept": "application/json",
+    "access-control-allow-credentials": "true",
+    "x-requested-with": "XMLHttpRequest",
+    "appversion": "24.7.1",
+    "app_version": "24.7.1",
+    "platform": "android",
+    "systemversion": "14",
+    "system_version": "14",
+    "source": "PLAY_STORE",
+    "compatible_components": COMPATIBLE_COMPONENTS,
+    "isinternaluser": "false",
+    "is_internal_user": "false",
+    "tobaccoconsentgiven": "false",
+    "tobacco_consent_given": "false",
+    "bundleversion": "v7",
+    "bundle_version": "v7",
+    "is_new_font": "true",
+    "accept-encoding": "gzip",
+    "host": "api.zepto.co.in"
+}
+
+
 def get_fresh_headers(store_id: str = None) -> dict:
     """
     Generate a fresh set of headers for Zepto API requests.
     """
-    device_uid = generate_device_uid()
-    session_id = generate_session_id()
-    request_id = generate_request_id()
-    user_agent = get_random_user_agent()
-    device_model = get_random_device_model()
-    device_brand = get_random_device_brand()
-
-    headers = {
-        "accept": "application/json",
-        "access-control-allow-credentials": "true",
-        "x-requested-with": "XMLHttpRequest",
+    device_uid = os.urandom(8).hex()
+    session_id = os.urandom(16).hex()
+    request_id = os.urandom(16).hex()
+
+    headers = _STATIC_HEADERS | {
         "sessionid": session_id,
         "session_id": session_id,
-        "appversion": "24.7.1",
-        "app_version": "24.7.1",
         "deviceuid": device_uid,
         "device_uid": device_uid,
-        "platform": "android",
-        "systemversion": "14",
-        "system_version": "14",
-        "source": "PLAY_STORE",
-        "device_model": device_model,
-        "device_brand": device_brand,
-        "compatible_components": COMPATIBLE_COMPONENTS,
-        "isinternaluser": "false",
-        "is_internal_user": "false",
-        "tobaccoconsentgiven": "false",
-        "tobacco_consent_given": "false",
+        "device_model": random.choice(DEVICE_MODELS),
+        "device_brand": random.choice(DEVICE_BRANDS),
         "requestid": request_id,
         "request_id": request_id,
-        "bundleversion": "v7",
-        "bundle_version": "v7",
-        "is_new_font": "true",
-        "accept-encoding": "gzip",
         "user_gppo": str(random.randint(1000, 5000)),
         "user_is_pass_user": random.choice(["true", "false"]),
         "user_days_since_last_bought": str(random.randint(1, 30)),
         "user_order_number": str(random.randint(1, 50)),
         "user_variant_hash": str(random.randint(10, 99)),
-        "connection": "Keep-Alive",
-        "user-agent": user_agent,
-        "host": "api.zepto.co.in"
+        "user-agent": random.choice(OKHTTP_USER_AGENTS)
     }
 
     if store_id:
@@ -116,20 +116,21 @@ def setup_environment(client_name: str) -> dict:
         for d in [failed_dir, output_dir, log_dir, scraped_data_dir]:
             os.makedirs(d, exist_ok=True)
 
-        # Configure logging to file and console
+        # Configure logging to file and console; WARNING by default, override with LOG_LEVEL
+        log_level = os.environ.get("LOG_LEVEL", "WARNING").upper()
         log_file = os.path.join(log_dir, f"{today_date}.log")
         logging.basicConfig(
             filename=log_file,
-            level=logging.INFO,
+            level=log_level,
             format="%(asctime)s - %(levelname)s - %(message)s",
             force=True
         )
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
+        console_handler.setLevel(log_level)
         console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
         logging.getLogger().addHandler(console_handler)
 
-        logging.info(f"Environment setup completed. Log file: {log_file}")
+        logging.info("Environment setup completed. Log file: %s", log_file)
         print(f"Log file created at: {log_file}")
 
         return {
@@ -1,44 +1,102 @@
 # scraper_zeto.py
 
 import os
+import re
+import html
 import json
+import orjson
+import asyncio
 import logging
+import httpx
 import pandas as pd
-import requests
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, Tuple
-from bs4 import BeautifulSoup
-
-from utils import (
-    generate_session_id,
-    generate_device_uid,
-    generate_request_id,
-    get_random_device_model,
-    get_random_device_brand,
-    get_random_user_agent
+from diskcache import Cache
+
+from utils import get_fresh_headers
+from api_helpers import (
+    create_async_client,
+    get_with_retries,
+    run_sync,
+    get_lat_long_zepto_async,
+    get_zepto_store_id_async,
+    get_edt_async
 )
-from api_helpers import get_lat_long_zepto, get_zepto_store_id, get_edt
-from config import ZYTE_PROXY, ZYTE_CERT, RETRY_DELAY
+from config import ZYTE_PROXY, ZYTE_CERT, CACHE_DIR, PINCODE_CACHE_TTL, PDP_CACHE_TTL, PRODUCT_CACHE_TTL
 
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
 
+# PDP pages and product detail go through the proxy; the other Zepto APIs are called directly
+_PROXY_URL = ZYTE_PROXY["https"] if ZYTE_PROXY else None
+
+# Pincode lookups are shared by many products, so persist them across runs
+_PINCODE_CACHE = Cache(os.path.join(CACHE_DIR, "zepto_pincode"))
+
+# Lookups still in progress, so concurrent products with the same pincode wait on one request chain
+_STORE_LOOKUPS: dict = {}
+_CITY_LOOKUPS: dict = {}
+
+# Response bodies for PDP HTML and product-detail JSON, so reruns skip unchanged pages.
+# Keyed on URL and query only; the per-request random headers don't affect the content.
+_HTTP_CACHE = Cache(os.path.join(CACHE_DIR, "zepto_http"))
+
+# Only the title span is needed from the PDP, so match it directly instead of parsing the page
+_TITLE_RE = re.compile(rb'<span[^>]*\sclass="text-sm font-semibold leading-\[14px\] text-\[#101418\]"[^>]*>([^<]+)<')
+
+_EDT_RE = re.compile(r'\d+')
+
+# One shared, thread-safe limiter so Nominatim's 1 request/second policy holds across calls
+_GEOLOCATOR = Nominatim(user_agent="pincode_to_city_app_v1")
+_GEOCODE = RateLimiter(
+    _GEOLOCATOR.geocode, min_delay_seconds=1, max_retries=2, error_wait_seconds=2, swallow_exceptions=False
+)
+
+@asynccontextmanager
+async def scrape_clients(limit: int = 64):
+    """
+    Open the direct and proxied HTTP/2 clients used by the async scrape functions.
+    Without a proxy configured, both are the same client.
+    """
+    async with create_async_client(limit) as client:
+        if not _PROXY_URL:
+            yield client, client
+            return
+        async with create_async_client(limit, proxy=_PROXY_URL) as proxy_client:
+            yield client, proxy_client
+
+
+async def _shared_lookup(lookups: dict, key, coro_factory):
+    """Await the lookup already running for key, or start one that later callers can join."""
+    task = lookups.get(key)
+    if task is None:
+        task = asyncio.create_task(coro_factory())
+        lookups[key] = task
+        task.add_done_callback(lambda _: lookups.pop(key, None))
+    # Shield it so one product being cancelled doesn't cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
 def get_city_from_pincode(pincode, country="India"):
     """
     Takes a pincode and returns the best matching city/town name for India.
     """
-    geolocator = Nominatim(user_agent="pincode_to_city_app_v1")
-    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
+    cached = _PINCODE_CACHE.get(("city", pincode, country))
+    if cached is not None:
+        return cached
 
     try:
-        location = geocode(
+        location = _GEOCODE(
             {"postalcode": pincode, "country": country},
             exactly_one=True,
             addressdetails=True
         )
 
         if not location:
-            return "Location not found"
+            city = "Location not found"
+            _PINCODE_CACHE.set(("city", pincode, country), city, expire=PINCODE_CACHE_TTL)
+            return city
 
         address = location.raw.get("address", {})
 
@@ -53,7 +111,9 @@ def get_city_from_pincode(pincode, country="India"):
             or address.get("state")
         )
 
-        return city if city else "City not found in address data"
+        city = city if city else "City not found in address data"
+        _PINCODE_CACHE.set(("city", pincode, country), city, expire=PINCODE_CACHE_TTL)
+        return city
 
     except Exception as e:
         return f"Error: {e}"
@@ -65,220 +125,305 @@ def extract_sku_from_url(url: str) -> str:
 
 
 def get_store_id_for_pincode(pincode: str) -> Tuple[Optional[str], Optional[float], Optional[float]]:
+    """Synchronous wrapper around get_store_id_for_pincode_async."""
+    return run_sync(get_store_id_for_pincode_async, pincode)
+
+
+def _parse_title(content: bytes) -> str:
+    """Extract the product title from PDP HTML, or '' if it is missing."""
+    m = _TITLE_RE.search(content)
+    if m:
+        return html.unescape(m.group(1).decode('utf-8', 'ignore')).strip()
+    return ''
+
+
+def scrape_product_title(pdp_url: str) -> str:
+    """Scrape product title from the Zepto PDP page HTML."""
+    try:
+        logging.info("Scraping product title from URL: %s", pdp_url)
+
+        content = run_sync(_fetch_pdp_async, pdp_url, proxy=_PROXY_URL)
+
+        title = _parse_title(content)
+        if title:
+            logging.info("Successfully scraped product title: %s", title)
+            return title
+
+        logging.warning("Could not find product title in HTML for URL: %s", pdp_url)
+        return ''
+
+    except Exception as e:
+        logging.error("Error scraping product title from %s: %s", pdp_url, e)
+        return ''
+
+
+def _extract_edt(edt_raw: Optional[str]) -> str:
+    """Extract only the number from a raw EDT string."""
+    m = _EDT_RE.search(str(edt_raw))
+    return m.group(0) if m else ''
+
+
+def _product_detail_request(sku_id: str, store_id: str) -> Tuple[str, dict, dict]:
+    """Build the URL, headers, and query for the product-detail API."""
+    url = "https://api.zepto.co.in/api/v1/inventory/catalogue/product-detail/"
+    headers = get_fresh_headers(store_id=store_id)
+
+    query = {
+        "product_variant_id": sku_id,
+        "store_id": store_id,
+        "is_zepto_three_enabled": "true"
+    }
+
+    return url, headers, query
+
+
+# Row fields used when the product-detail API returns 404
+_NOT_FOUND_FIELDS = {
+    'title': 'Item Not Found',
+    'mrp': '',
+    'live_price': '',
+    'is_available': 'Item Not Found'
+}
+
+
+def _as_dict(value) -> dict:
+    """Return value if it's a dict, otherwise an empty one."""
+    return value if isinstance(value, dict) else {}
+
+
+def _to_rupees(paise) -> Optional[float]:
+    """Convert a price in paise to rupees, or None if it isn't a number."""
+    return paise / 100 if isinstance(paise, (int, float)) else None
+
+
+def _parse_product(data: dict, scraped_title: str) -> dict:
+    """Extract title, pricing, and availability from a product-detail response."""
+    # Walk down to the store product once; missing or malformed levels fall back to empty dicts
+    product = _as_dict(_as_dict(data).get('product'))
+    store_products = product.get('storeProducts')
+    store_product = _as_dict(store_products[0] if isinstance(store_products, list) and store_products else None)
+    variant = _as_dict(store_product.get('productVariant'))
+
+    # Use scraped title if available, otherwise fall back to API response
+    product_name = scraped_title or product.get('name', 'Unknown')
+
+    # Extract pricing and availability
+    mrp = _to_rupees(variant.get('mrp'))
+
+    price = _to_rupees(store_product.get('discountedSellingPrice'))
+    if price is None:
+        price = _to_rupees(store_product.get('sellingPrice'))
+
+    if 'outOfStock' in store_product:
+        availability = 'Yes' if not store_product['outOfStock'] else 'No'
+    else:
+        availability = 'Unknown'
+
+    return {
+        'title': product_name,
+        'mrp': mrp if mrp is not None else '',
+        'live_price': price if price is not None else '',
+        'is_available': availability
+    }
+
+
+def _product_row(source_date: str, platform: str, f_brand: str, city: str, sku_id: str,
+                 pincode: str, fields: dict, edt: str) -> dict:
+    """Assemble the output row for a scraped product."""
+    return {
+        'source_date': source_date,
+        'platform': platform,
+        'f_brand': f_brand,
+        'city': city,
+        'sku': sku_id,
+        'pincode': pincode,
+        **fields,
+        'edt': edt
+    }
+
+
+def scrape_product(pdp_url: str, pincode: str, platform: str = "zepto", f_brand: str = "origami") -> Optional[dict]:
+    """Scrape product data from Zepto API using PDP URL and pincode."""
+    async def runner():
+        async with scrape_clients() as (client, proxy_client):
+            return await scrape_product_async(pdp_url, pincode, client, proxy_client, platform, f_brand)
+    return asyncio.run(runner())
+
+
+async def get_store_id_for_pincode_async(pincode: str, client: httpx.AsyncClient) -> Tuple[Optional[str], Optional[float], Optional[float]]:
     """Get store ID, latitude, and longitude for a pincode."""
     # First try to get lat/lng
-    lat, lng = get_lat_long_zepto(pincode)
+    lat, lng = await get_lat_long_zepto_async(pincode, client)
     if not lat or not lng:
-        logging.error(f"Could not get coordinates for pincode {pincode}")
+        logging.error("Could not get coordinates for pincode %s", pincode)
         return None, None, None
 
     # Then get store ID
-    store_id = get_zepto_store_id(lat, lng, pincode)
+    store_id = await get_zepto_store_id_async(lat, lng, pincode, client)
     if not store_id:
-        logging.error(f"Could not get store ID for pincode {pincode}")
+        logging.error("Could not get store ID for pincode %s", pincode)
         return None, None, None
 
     return store_id, lat, lng
 
 
-def scrape_product_title(pdp_url: str) -> str:
-    """Scrape product title from the Zepto PDP page HTML."""
-    try:
-        logging.info(f"Scraping product title from URL: {pdp_url}")
+async def _resolve_pincode_async(pincode: str, client: httpx.AsyncClient) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """Get latitude, longitude, and store ID for a pincode, using the pincode cache."""
+    cached = _PINCODE_CACHE.get(("store", pincode))
+    if cached is not None:
+        return cached
 
-        session = requests.Session()
-        requests.packages.urllib3.disable_warnings()
+    async def lookup():
+        store_id, lat, lng = await get_store_id_for_pincode_async(pincode, client)
+        if store_id:
+            _PINCODE_CACHE.set(("store", pincode), (lat, lng, store_id), expire=PINCODE_CACHE_TTL)
+        return lat, lng, store_id
 
-        if ZYTE_PROXY:
-            response = session.get(pdp_url, timeout=20, verify=False, proxies=ZYTE_PROXY)
-        else:
-            response = session.get(pdp_url, timeout=15, verify=False)
+    return await _shared_lookup(_STORE_LOOKUPS, pincode, lookup)
 
-        response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
+async def _get_city_async(pincode: str) -> str:
+    """Get the city for a pincode, running geopy's synchronous lookup in a worker thread."""
+    cached = _PINCODE_CACHE.get(("city", pincode, "India"))
+    if cached is not None:
+        return cached
 
-        # Find the title element based on the provided HTML structure
-        title_element = soup.find('span', class_='text-sm font-semibold leading-[14px] text-[#101418]')
-        if title_element:
-            title = title_element.get_text(strip=True)
-            logging.info(f"Successfully scraped product title: {title}")
-            return title
+    return await _shared_lookup(_CITY_LOOKUPS, pincode, lambda: asyncio.to_thread(get_city_from_pincode, pincode))
 
-        logging.warning(f"Could not find product title in HTML for URL: {pdp_url}")
-        return ''
+
+async def _fetch_pdp_async(pdp_url: str, client: httpx.AsyncClient) -> bytes:
+    """Fetch the Zepto PDP page HTML, or b'' if it can't be fetched."""
+    try:
+        logging.info("Fetching product page from URL: %s", pdp_url)
+
+        content = _HTTP_CACHE.get(("pdp", pdp_url))
+        if content is None:
+            response = await get_with_retries(client, pdp_url)
+
+            response.raise_for_status()
+            content = response.content
+            # Cache only the title span, and only when it's there: a bot check or partial render
+            # shouldn't stick for a day, and the rest of the page is never read
+            match = _TITLE_RE.search(content)
+            if match:
+                _HTTP_CACHE.set(("pdp", pdp_url), match.group(0), expire=PDP_CACHE_TTL)
+
+        return content
 
     except Exception as e:
-        logging.error(f"Error scraping product title from {pdp_url}: {e}")
-        return ''
+        logging.error("Error fetching product page from %s: %s", pdp_url, e)
+        return b''
 
 
-def scrape_product(pdp_url: str, pincode: str, platform: str = "zepto", f_brand: str = "origami") -> Optional[pd.Series]:
-    """Scrape product data from Zepto API using PDP URL and pincode."""
+async def _fetch_bytes(pdp_url: str, pincode: str, client: httpx.AsyncClient, proxy_client: httpx.AsyncClient,
+                       platform: str = "zepto", f_brand: str = "origami") -> Optional[dict]:
+    """
+    Run all network calls for a product and return the raw responses for _parse_bytes.
+    Returns None if the product can't be scraped.
+    """
 
     # Get today's date for source_date
     source_date = datetime.now().strftime('%d-%m-%Y')
 
-    # Get city from pincode
-    city = get_city_from_pincode(pincode)
-    logging.info(f"City for pincode {pincode}: {city}")
-
     # Extract SKU ID from URL
     sku_id = extract_sku_from_url(pdp_url)
-    logging.info(f"Extracted SKU ID: {sku_id} from URL: {pdp_url}")
+    logging.info("Extracted SKU ID: %s from URL: %s", sku_id, pdp_url)
 
-    # Scrape product title from HTML
-    scraped_title = scrape_product_title(pdp_url)
+    # City, page and store lookups are independent, so run them concurrently
+    city_task = asyncio.create_task(_get_city_async(pincode))
+    pdp_task = asyncio.create_task(_fetch_pdp_async(pdp_url, proxy_client))
 
-    # Get store information
-    store_id, lat, lng = get_store_id_for_pincode(pincode)
-    if not store_id:
-        logging.error("Failed to get store information")
-        return None
-
-    logging.info(f"Store ID: {store_id}, Coordinates: {lat}, {lng}")
-
-    # Get EDT and extract only the number
-    edt_raw = get_edt(lat, lng, store_id)
-    import re
-    numbers = re.findall(r'\d+', str(edt_raw))
-    edt = numbers[0] if numbers else ''
-    logging.info(f"EDT: {edt} (raw: {edt_raw})")
+    try:
+        # Get store information
+        lat, lng, store_id = await _resolve_pincode_async(pincode, client)
+        if not store_id:
+            logging.error("Failed to get store information")
+            return None
 
-    # Prepare API request
-    url = "https://api.zepto.co.in/api/v1/inventory/catalogue/product-detail/"
-    session_id = generate_session_id()
-    device_uid = generate_device_uid()
-    request_id = generate_request_id()
-
-    headers = {
-        "accept": "application/json",
-        "access-control-allow-credentials": "true",
-        "x-requested-with": "XMLHttpRequest",
-        "sessionid": session_id,
-        "session_id": session_id,
-        "appversion": "24.7.1",
-        "app_version": "24.7.1",
-        "deviceuid": device_uid,
-        "device_uid": device_uid,
-        "platform": "android",
-        "systemversion": "14",
-        "system_version": "14",
-        "source": "PLAY_STORE",
-        "device_model": get_random_device_model(),
-        "device_brand": get_random_device_brand(),
-        "user-agent": get_random_user_agent(),
-        "host": "api.zepto.co.in",
-        "storeid": store_id,
-        "store_id": store_id,
-        "lastselectedstoreid": store_id,
-        "last_selected_store_id": store_id
-    }
+        logging.info("Store ID: %s, Coordinates: %s, %s", store_id, lat, lng)
 
-    query = {
-        "product_variant_id": sku_id,
-        "store_id": store_id,
-        "is_zepto_three_enabled": "true"
-    }
+        # Get EDT and extract only the number
+        edt_raw = await get_edt_async(lat, lng, store_id, client)
+        edt = _extract_edt(edt_raw)
+        logging.info("EDT: %s (raw: %s)", edt, edt_raw)
 
-    try:
-        session = requests.Session()
-        requests.packages.urllib3.disable_warnings()
-        import time
-        time.sleep(RETRY_DELAY)
+        # Prepare API request
+        url, headers, query = _product_detail_request(sku_id, store_id)
 
-        if ZYTE_PROXY:
-            response = session.get(url, params=query, headers=headers, timeout=20, verify=False, proxies=ZYTE_PROXY)
+        body = _HTTP_CACHE.get(("product", sku_id, store_id))
+        if body is not None:
+            status = 200
         else:
-            response = session.get(url, params=query, headers=headers, timeout=15, verify=False)
+            response = await get_with_retries(proxy_client, url, params=query, headers=headers)
 
-        if response.status_code == 404:
-            logging.info("Product not found (404)")
-            return pd.Series({
-                'source_date': source_date,
-                'platform': platform,
-                'f_brand': f_brand,
-                'city': city,
-                'sku': sku_id,
-                'pincode': pincode,
-                'title': 'Item Not Found',
-                'mrp': '',
-                'live_price': '',
-                'is_available': 'Item Not Found',
-                'edt': edt
-            })
-
-        if response.status_code != 200:
-            logging.error(f"Request failed with status code {response.status_code}")
+            status = response.status_code
+            body = response.content
+            if status == 200:
+                _HTTP_CACHE.set(("product", sku_id, store_id), body, expire=PRODUCT_CACHE_TTL)
+
+        if status not in (200, 404):
+            logging.error("Request failed with status code %s", status)
             return None
 
-        data = response.json()
+        # Get city from pincode
+        city = await city_task
+        logging.info("City for pincode %s: %s", pincode, city)
 
-        # Extract basic info
-        # Use scraped title if available, otherwise fall back to API response
-        if scraped_title:
-            product_name = scraped_title
-        else:
-            try:
-                product_name = data['product']['name']
-            except (KeyError, TypeError):
-                product_name = 'Unknown'
-
-        try:
-            brand = data['product']['brand']
-        except (KeyError, TypeError):
-            brand = ''
-
-        try:
-            product_id = data['product']['id']
-            zepto_url = f"https://www.zeptonow.com/product/{product_id}"
-        except (KeyError, TypeError):
-            zepto_url = pdp_url
-
-        # Extract pricing and availability
-        try:
-            mrp = data['product']['storeProducts'][0]['productVariant']['mrp'] / 100
-        except (KeyError, IndexError, TypeError):
-            mrp = ''
-
-        try:
-            price = data['product']['storeProducts'][0]['discountedSellingPrice'] / 100
-        except (KeyError, IndexError, TypeError):
-            try:
-                price = data['product']['storeProducts'][0]['sellingPrice'] / 100
-            except (KeyError, IndexError, TypeError):
-                price = ''
-
-        try:
-            availability = 'Yes' if not data['product']['storeProducts'][0]['outOfStock'] else 'No'
-        except (KeyError, IndexError, TypeError):
-            availability = 'Unknown'
-
-        try:
-            quantity = data['product']['storeProducts'][0]['productVariant']['formattedPacksize']
-        except (KeyError, IndexError, TypeError):
-            quantity = ''
-
-        return pd.Series({
+        return {
             'source_date': source_date,
             'platform': platform,
             'f_brand': f_brand,
             'city': city,
             'sku': sku_id,
             'pincode': pincode,
-            'title': product_name,
-            'mrp': mrp,
-            'live_price': price,
-            'is_available': availability,
-            'edt': edt
-        })
-
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request error: {e}")
+            'edt': edt,
+            'status': status,
+            'product_body': body,
+            'pdp_html': await pdp_task if status == 200 else b''
+        }
+
+    except httpx.HTTPError as e:
+        logging.error("Request error: %s", e)
         return None
     except Exception as e:
-        logging.error(f"Error processing product: {e}")
+        logging.error("Error processing product: %s", e)
+        return None
+    finally:
+        # Don't leave lookups running when the product fails early
+        city_task.cancel()
+        pdp_task.cancel()
+
+
+def _parse_bytes(raw: dict) -> Optional[dict]:
+    """
+    Build the product row from the raw responses collected by _fetch_bytes.
+    Pure CPU work: one regex over the page and one JSON decode.
+    """
+    try:
+        if raw['status'] == 404:
+            logging.info("Product not found (404)")
+            fields = _NOT_FOUND_FIELDS
+        else:
+            title = _parse_title(raw['pdp_html'])
+            if not title:
+                logging.warning("Could not find product title in HTML for SKU: %s", raw['sku'])
+            fields = _parse_product(orjson.loads(raw['product_body']), title)
+
+        return _product_row(raw['source_date'], raw['platform'], raw['f_brand'], raw['city'],
+                            raw['sku'], raw['pincode'], fields, raw['edt'])
+
+    except Exception as e:
+        logging.error("Error processing product: %s", e)
+        return None
+
+
+async def scrape_product_async(pdp_url: str, pincode: str, client: httpx.AsyncClient, proxy_client: httpx.AsyncClient,
+                               platform: str = "zepto", f_brand: str = "origami") -> Optional[dict]:
+    """Async variant of scrape_product; clients from scrape_clients() can be shared across products."""
+    raw = await _fetch_bytes(pdp_url, pincode, client, proxy_client, platform, f_brand)
+    if raw is None:
         return None
+    return _parse_bytes(raw)
 
 
 def main():
@@ -293,23 +438,25 @@ def main():
     )
 
     logging.info("Starting Zepto product scraper")
-    logging.info(f"PDP URL: {PDP_URL}")
-    logging.info(f"Pincode: {PINCODE}")
+    logging.info("PDP URL: %s", PDP_URL)
+    logging.info("Pincode: %s", PINCODE)
 
     # Scrape the product
+    rows = []
     result = scrape_product(PDP_URL, PINCODE)
 
     if result is None:
         logging.error("Failed to scrape product")
         return
+    rows.append(result)
 
-    # Create DataFrame and save to CSV
-    df = pd.DataFrame([result])
+    # Build the DataFrame once from the collected rows and save to CSV
+    df = pd.DataFrame(rows)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_filename = f"zepto_product_{timestamp}.csv"
 
     df.to_csv(csv_filename, index=False)
-    logging.info(f"Product data saved to {csv_filename}")
+    logging.info("Product data saved to %s", csv_filename)
     print(f"Product data saved to {csv_filename}")
 
     # Print the result